@@ -3,17 +3,31 @@ action_executor.py - Mouse and keyboard control with human-like randomization
 """
 
 import time
-import random
-import pyautogui
+import numpy as np
 from typing import Tuple, Optional
+from pynput.mouse import Button, Controller as MouseController
+from pynput.keyboard import Key, Controller as KeyboardController
 
 import config
 from logger import logger
 from window_manager import window_manager
 
 
-# Disable pyautogui fail-safe (we handle errors ourselves)
-pyautogui.FAILSAFE = False
+# pynput button lookup for the button names used by click()
+MOUSE_BUTTONS = {
+    'left': Button.left,
+    'right': Button.right,
+    'middle': Button.middle,
+}
+
+# Cursor update interval while moving (seconds)
+MOVE_STEP_INTERVAL = 0.01
+
+# Skip the move animation when the cursor is already this close (pixels)
+NEAR_TARGET_RADIUS = 5
+
+# Number of uniform random values generated per refill of the pool
+RANDOM_POOL_SIZE = 1024
 
 
 class ActionExecutor:
@@ -21,16 +35,49 @@ class ActionExecutor:
 
     def __init__(self):
         self.last_click_time = 0
+        # pynput issues OS input events directly, without pyautogui's
+        # built-in PAUSE after every call - timing is up to _human_delay
+        self._mouse = MouseController()
+        self._keyboard = KeyboardController()
+        # Cached window origin, refreshed when window_manager.generation changes
+        self._win_gen = -1
+        self._ox = 0
+        self._oy = 0
+        # Uniform [0, 1) values drawn in bulk and consumed one at a time
+        self._rng = np.random.default_rng()
+        self._uniform_pool = self._rng.uniform(0, 1, RANDOM_POOL_SIZE)
+        self._uniform_idx = 0
+        # Where the last move left the cursor (None until the first move)
+        self._last_pos: Optional[Tuple[int, int]] = None
+
+    def _u01(self) -> float:
+        """Next uniform [0, 1) value from the pool, refilling when exhausted"""
+        if self._uniform_idx >= RANDOM_POOL_SIZE:
+            self._uniform_pool = self._rng.uniform(0, 1, RANDOM_POOL_SIZE)
+            self._uniform_idx = 0
+        value = self._uniform_pool[self._uniform_idx]
+        self._uniform_idx += 1
+        return float(value)
+
+    def _abs(self, x: int, y: int) -> Tuple[int, int]:
+        """Convert window-relative coordinates to absolute screen coordinates"""
+        if window_manager.generation != self._win_gen:
+            self._ox, self._oy = window_manager.origin
+            self._win_gen = window_manager.generation
+        return x + self._ox, y + self._oy
 
     def _randomize_point(self, x: int, y: int, radius: int = 3) -> Tuple[int, int]:
         """Add random offset to coordinates to look more human"""
-        offset_x = random.randint(-radius, radius)
-        offset_y = random.randint(-radius, radius)
+        u01 = self._u01
+        span = 2 * radius + 1
+        offset_x = int(u01() * span) - radius
+        offset_y = int(u01() * span) - radius
         return x + offset_x, y + offset_y
 
     def _random_duration(self, duration_range: Tuple[float, float]) -> float:
         """Get random duration within range"""
-        return random.uniform(duration_range[0], duration_range[1])
+        low, high = duration_range
+        return low + (high - low) * self._u01()
 
     def _human_delay(self, delay_range: Tuple[float, float] = None):
         """Add human-like delay"""
@@ -40,6 +87,40 @@ class ActionExecutor:
         delay = self._random_duration(delay_range)
         time.sleep(delay)
 
+    def _move_timed(self, x: int, y: int, duration: float):
+        """Move cursor to (x, y) in a straight line over duration seconds"""
+        # Bind lookups used in the step loop to locals
+        mouse = self._mouse
+        perf_counter = time.perf_counter
+        sleep = time.sleep
+
+        start_x, start_y = mouse.position
+        dx, dy = x - start_x, y - start_y
+        steps = max(1, int(duration / MOVE_STEP_INTERVAL))
+        step_delay = duration / steps
+
+        # Schedule each step against a perf_counter deadline so time spent
+        # setting the position doesn't accumulate on top of the sleeps
+        next_t = perf_counter()
+        for i in range(1, steps + 1):
+            t = i / steps
+            mouse.position = (round(start_x + dx * t), round(start_y + dy * t))
+            next_t += step_delay
+            sleep(max(0.0, next_t - perf_counter()))
+
+        self._last_pos = (x, y)
+
+    def _near_cursor(self, x: int, y: int) -> bool:
+        """Check if the cursor is already within NEAR_TARGET_RADIUS of (x, y)"""
+        last_x, last_y = self._last_pos if self._last_pos is not None else self._mouse.position
+        return abs(last_x - x) <= NEAR_TARGET_RADIUS and abs(last_y - y) <= NEAR_TARGET_RADIUS
+
+    def _move_duration(self, x: int, y: int) -> float:
+        """Sampled move duration, or 0 if the cursor is already at the target"""
+        if self._near_cursor(x, y):
+            return 0.0
+        return self._random_duration(config.MOUSE_MOVEMENT_DURATION)
+
     def move_mouse(self, x: int, y: int, relative: bool = True, randomize: bool = True):
         """
         Move mouse to position
@@ -50,7 +131,7 @@ class ActionExecutor:
             randomize: Add random offset to look human
         """
         if relative:
-            abs_x, abs_y = window_manager.get_absolute_coords(x, y)
+            abs_x, abs_y = self._abs(x, y)
         else:
             abs_x, abs_y = x, y
 
@@ -60,8 +141,8 @@ class ActionExecutor:
         duration = self._random_duration(config.MOUSE_MOVEMENT_DURATION)
 
         try:
-            pyautogui.moveTo(abs_x, abs_y, duration=duration)
-            logger.debug(f"Mouse moved to ({abs_x}, {abs_y})")
+            self._move_timed(abs_x, abs_y, duration)
+            logger.debug("Mouse moved to (%d, %d)", abs_x, abs_y)
         except Exception as e:
             logger.error(f"Failed to move mouse: {e}")
 
@@ -78,7 +159,7 @@ class ActionExecutor:
             button: Mouse button ('left', 'right', 'middle')
         """
         if relative:
-            abs_x, abs_y = window_manager.get_absolute_coords(x, y)
+            abs_x, abs_y = self._abs(x, y)
         else:
             abs_x, abs_y = x, y
 
@@ -86,15 +167,15 @@ class ActionExecutor:
             abs_x, abs_y = self._randomize_point(abs_x, abs_y)
 
         try:
-            # Move to position
-            duration = self._random_duration(config.MOUSE_MOVEMENT_DURATION)
-            pyautogui.moveTo(abs_x, abs_y, duration=duration)
+            # Move to position (snaps without animation if already there)
+            duration = self._move_duration(abs_x, abs_y)
+            self._move_timed(abs_x, abs_y, duration)
 
             # Small delay before click
             time.sleep(self._random_duration((0.05, 0.15)))
 
             # Click
-            pyautogui.click(button=button)
+            self._mouse.click(MOUSE_BUTTONS[button])
 
             # Log the click
             logger.log_click(abs_x, abs_y, item_name)
@@ -123,8 +204,8 @@ class ActionExecutor:
             randomize: Add random offset
         """
         if relative:
-            abs_start_x, abs_start_y = window_manager.get_absolute_coords(start_x, start_y)
-            abs_end_x, abs_end_y = window_manager.get_absolute_coords(end_x, end_y)
+            abs_start_x, abs_start_y = self._abs(start_x, start_y)
+            abs_end_x, abs_end_y = self._abs(end_x, end_y)
         else:
             abs_start_x, abs_start_y = start_x, start_y
             abs_end_x, abs_end_y = end_x, end_y
@@ -135,12 +216,16 @@ class ActionExecutor:
 
         try:
             duration = self._random_duration(config.MOUSE_MOVEMENT_DURATION)
-            pyautogui.moveTo(abs_start_x, abs_start_y, duration=duration * 0.5)
+            setup_duration = 0.0 if self._near_cursor(abs_start_x, abs_start_y) else duration * 0.5
+            self._move_timed(abs_start_x, abs_start_y, setup_duration)
 
             time.sleep(0.1)
 
-            pyautogui.drag(abs_end_x - abs_start_x, abs_end_y - abs_start_y,
-                          duration=duration, button='left')
+            self._mouse.press(Button.left)
+            try:
+                self._move_timed(abs_end_x, abs_end_y, duration)
+            finally:
+                self._mouse.release(Button.left)
 
             logger.log_action("DRAG", f"from ({abs_start_x}, {abs_start_y}) to ({abs_end_x}, {abs_end_y})")
 
@@ -155,22 +240,28 @@ class ActionExecutor:
 
         Args:
             text: Text to type
-            interval: Time between keystrokes (random if None)
+            interval: Time between keystrokes (random per keystroke if None)
         """
         if interval is None:
-            interval = random.uniform(0.05, 0.15)
+            intervals = self._rng.uniform(0.05, 0.15, len(text))
+        else:
+            intervals = [interval] * len(text)
 
         try:
-            pyautogui.typewrite(text, interval=interval)
+            for char, char_interval in zip(text, intervals):
+                self._keyboard.type(char)
+                time.sleep(char_interval)
             logger.log_action("TYPE", text)
             self._human_delay(config.CLICK_DELAY)
         except Exception as e:
             logger.error(f"Failed to type text: {e}")
 
     def press_key(self, key: str):
-        """Press a single key"""
+        """Press a single key (character or pynput Key name, e.g. 'enter', 'esc')"""
         try:
-            pyautogui.press(key)
+            pynput_key = Key[key] if key in Key.__members__ else key
+            self._keyboard.press(pynput_key)
+            self._keyboard.release(pynput_key)
             logger.log_action("KEY_PRESS", key)
             self._human_delay(config.CLICK_DELAY)
         except Exception as e:
@@ -13,10 +13,22 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
 OPENAI_MODEL = "gpt-4o"
 
+# Smaller, faster models for trivial prompts (yes/no, single numbers)
+CLAUDE_APPRENTICE_MODEL = "claude-3-5-haiku-20241022"
+OPENAI_APPRENTICE_MODEL = "gpt-4o-mini"
+
+# Number of recent VLM responses cached by (image, prompt)
+VLM_CACHE_SIZE = 128
+# Max VLM requests in flight at once (provider rate limits)
+VLM_MAX_CONCURRENCY = 4
+# Lossy format for VLM images: "webp" (smallest payload) or "jpeg"
+# Pixel-exact inventory prompts are always sent as lossless PNG
+VLM_IMAGE_FORMAT = "webp"
+
 # Paths
 SCREENSHOT_DIR = "screenshots"
 LOG_DIR = "logs"
-WINDOW_CONFIG_FILE = "window_config.json"
+WINDOW_CONFIG_FILE = "window_config.bin"  # Packed x, y, width, height
 
 # Game Window
 GAME_NAME = "RuneLite"  # Window title to search for
@@ -26,12 +38,22 @@ MOUSE_MOVEMENT_DURATION = (0.3, 0.8)  # Min/max seconds for mouse movement
 CLICK_DELAY = (0.1, 0.3)  # Delay after clicking
 HUMAN_REACTION_TIME = (0.5, 1.5)  # Delay to simulate human thinking
 
+# Inventory slot grid (x, y, width, height) relative to the game window -
+# just the 4x7 slots, no panel border or tab bar, so it splits evenly into
+# slot cells. Checked on a 943x996 fixed-mode RuneLite window; VLM inventory
+# queries only see this crop - adjust for your client layout.
+INVENTORY_ROI = (710, 583, 200, 308)
+# Game view (x, y, width, height) used for ground-level checks like fire detection
+GAME_VIEW_ROI = (0, 0, 739, 996)
+
 # Screenshot Settings
 SAVE_DEBUG_SCREENSHOTS = True
+SCREENSHOT_QUALITY = 70  # JPEG quality for saved debug screenshots
 ANNOTATE_SCREENSHOTS = True  # Draw boxes on detected objects
 
 # Logging
-LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
+LOG_LEVEL = "INFO"  # Console level: DEBUG, INFO, WARNING, ERROR
+LOG_FILE_LEVEL = "DEBUG"  # Log file level
 COLORIZE_LOGS = True
 
 # Agent Settings
@@ -11,7 +11,7 @@ from logger import logger
 from window_manager import window_manager
 from screen_capture import screen_capture
 from action_executor import action_executor
-from vision import vision_model
+from vision import get_vision_model
 from skills import skill_library
 import config
 
@@ -46,7 +46,7 @@ class FiremakingAgent:
         logger.log_success("Screenshot capture working")
 
         # Check VLM
-        if not vision_model.client:
+        if not get_vision_model().client:
             logger.warning("VLM not initialized. Visual understanding will not work.")
             logger.warning("Set ANTHROPIC_API_KEY or OPENAI_API_KEY environment variable.")
 
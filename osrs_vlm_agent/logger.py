@@ -2,9 +2,13 @@
 logger.py - Real-time logging system with color support
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Optional
 
 import config
@@ -35,12 +39,16 @@ class AgentLogger:
     """Logger for OSRS VLM Agent with real-time action logging"""
 
     def __init__(self, name: str = "OSRSAgent"):
+        console_level = getattr(logging, config.LOG_LEVEL)
+        file_level = getattr(logging, config.LOG_FILE_LEVEL)
+
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, config.LOG_LEVEL))
+        # Records below both handler levels are dropped before formatting
+        self.logger.setLevel(min(console_level, file_level))
 
         # Console handler with colors
         console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG)
+        console_handler.setLevel(console_level)
 
         # Format: [TIME] LEVEL - Message
         formatter = ColoredFormatter(
@@ -49,67 +57,82 @@ class AgentLogger:
         )
         console_handler.setFormatter(formatter)
 
-        self.logger.addHandler(console_handler)
-
         # File handler for persistent logs
-        log_file = f"{config.LOG_DIR}/agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        log_dir = Path(config.LOG_DIR)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_file = log_dir / f"agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
+        file_handler.setLevel(file_level)
         file_formatter = logging.Formatter(
             '%(asctime)s | %(levelname)s | %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
 
-        self.info(f"Logger initialized. Logs saved to: {log_file}")
+        # Callers only enqueue records; a listener thread does the console
+        # and file writes so I/O never blocks the action loop
+        log_queue = queue.Queue(-1)
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self._listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+        self.info("Logger initialized. Logs saved to: %s", log_file)
 
-    def debug(self, msg: str):
-        self.logger.debug(msg)
+    # Messages use %-style args so formatting only happens if the record is emitted
+    def debug(self, msg: str, *args):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(msg, *args)
 
-    def info(self, msg: str):
-        self.logger.info(msg)
+    def info(self, msg: str, *args):
+        self.logger.info(msg, *args)
 
-    def warning(self, msg: str):
-        self.logger.warning(msg)
+    def warning(self, msg: str, *args):
+        self.logger.warning(msg, *args)
 
-    def error(self, msg: str):
-        self.logger.error(msg)
+    def error(self, msg: str, *args):
+        self.logger.error(msg, *args)
 
-    def critical(self, msg: str):
-        self.logger.critical(msg)
+    def critical(self, msg: str, *args):
+        self.logger.critical(msg, *args)
 
     # Custom logging methods for agent actions
     def log_click(self, x: int, y: int, item: Optional[str] = None):
         """Log mouse click with coordinates"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         item_str = f" on '{item}'" if item else ""
-        self.info(f"🖱️  CLICK at ({x}, {y}){item_str}")
+        self.info("🖱️  CLICK at (%d, %d)%s", x, y, item_str)
 
     def log_action(self, action: str, details: str = ""):
         """Log agent action"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         details_str = f" - {details}" if details else ""
-        self.info(f"🎮 ACTION: {action}{details_str}")
+        self.info("🎮 ACTION: %s%s", action, details_str)
 
     def log_vision(self, observation: str):
         """Log VLM observation"""
-        self.info(f"👁️  VISION: {observation}")
+        self.info("👁️  VISION: %s", observation)
 
     def log_decision(self, decision: str):
         """Log agent decision"""
-        self.info(f"🧠 DECISION: {decision}")
+        self.info("🧠 DECISION: %s", decision)
 
     def log_skill(self, skill_name: str, status: str = "executing"):
         """Log skill execution"""
-        self.info(f"⚡ SKILL: {skill_name} ({status})")
+        self.info("⚡ SKILL: %s (%s)", skill_name, status)
 
     def log_error(self, error: str, retry: bool = False):
         """Log error with optional retry info"""
         retry_str = " - Will retry" if retry else ""
-        self.error(f"❌ ERROR: {error}{retry_str}")
+        self.error("❌ ERROR: %s%s", error, retry_str)
 
     def log_success(self, task: str):
         """Log successful task completion"""
-        self.info(f"✅ SUCCESS: {task}")
+        self.info("✅ SUCCESS: %s", task)
 
 
 # Global logger instance
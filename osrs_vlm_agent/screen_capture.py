@@ -2,24 +2,75 @@
 screen_capture.py - Screenshot capture for RuneLite window
 """
 
+import io
+import queue
+import threading
 import mss
 import mss.tools
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
+from pathlib import Path
 from typing import Optional, List, Tuple
 
 import config
 from logger import logger
 from window_manager import window_manager
 
+# Optional: PyTurboJPEG calls libjpeg-turbo's SIMD encoder directly
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError):
+    _turbojpeg = None
+
+
+def encode_jpeg(image: Image.Image, quality: int = 75) -> bytes:
+    """Encode PIL Image as JPEG bytes (uses PyTurboJPEG when installed)"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if _turbojpeg is not None:
+        return _turbojpeg.encode(np.asarray(image), quality=quality, pixel_format=TJPF_RGB)
+
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
 
 class ScreenCapture:
     """Handles screenshot capture and annotation"""
 
     def __init__(self):
         self.screenshot_count = 0
-
-    def capture(self, save: bool = True, annotate: bool = False,
+        self._screenshot_dir = Path(config.SCREENSHOT_DIR)
+        self._screenshot_dir.mkdir(parents=True, exist_ok=True)
+        # Cached capture region, refreshed when window_manager.generation changes
+        self._win_gen = -1
+        self._region = None
+        # Set after a successful grab; skips the window readiness check
+        # until a grab fails
+        self._ready = False
+        # mss handles hold a display connection and are not thread-safe on
+        # every backend, so keep one per thread and reuse it across frames
+        self._local = threading.local()
+        # Label font, loaded once instead of on every draw.text call
+        self._font = ImageFont.load_default()
+        # Debug screenshots are encoded and written by a background thread
+        # so the agent loop never waits on image encoding or disk I/O
+        self._save_q = queue.Queue(maxsize=8)
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def _get_sct(self) -> "mss.base.MSSBase":
+        """Get this thread's mss instance, creating it on first use"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def capture(self, save: bool = False, annotate: bool = False,
                 boxes: Optional[List[Tuple[int, int, int, int, str]]] = None) -> Optional[Image.Image]:
         """
         Capture screenshot of RuneLite window
@@ -32,29 +83,41 @@ class ScreenCapture:
         Returns:
             PIL Image or None if failed
         """
-        if not window_manager.is_ready():
+        if not self._ready and not window_manager.is_ready():
             logger.error("Window manager not ready")
             return None
 
-        region = window_manager.get_region()
+        # Picks up window moves; bumps generation if the window changed
+        window_manager.poll_events()
+
+        if window_manager.generation != self._win_gen:
+            region = window_manager.get_region()
+            # mss reads a tuple as (left, top, right, bottom), so pass a dict
+            self._region = region._asdict() if region else None
+            self._win_gen = window_manager.generation
+        region = self._region
 
         try:
             # Simple mss capture - coordinates are now validated
-            with mss.mss() as sct:
-                screenshot = sct.grab(region)
-                image = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+            screenshot = self._get_sct().grab(region)
+            # View the BGRA buffer as an array and reorder to RGB in a single copy
+            raw = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+                screenshot.height, screenshot.width, 4)
+            image = Image.fromarray(np.ascontiguousarray(raw[:, :, 2::-1]))
+            self._ready = True
 
             # Annotate if requested
             if annotate and boxes:
                 image = self._annotate_image(image, boxes)
 
             # Save if requested
-            if save:
+            if save and config.SAVE_DEBUG_SCREENSHOTS:
                 self._save_screenshot(image)
 
             return image
 
         except Exception as e:
+            self._ready = False
             logger.error(f"Failed to capture screenshot: {e}")
             return None
 
@@ -70,21 +133,38 @@ class ScreenCapture:
             draw.rectangle([x1, y1, x2, y2], outline="red", width=2)
 
             # Draw label
-            draw.text((x1, y1 - 10), label, fill="red")
+            draw.text((x1, y1 - 10), label, fill="red", font=self._font)
 
         return image
 
-    def _save_screenshot(self, image: Image.Image) -> str:
-        """Save screenshot to file"""
+    def _save_screenshot(self, image: Image.Image) -> Path:
+        """Queue screenshot to be written to file by the writer thread"""
         self.screenshot_count += 1
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{config.SCREENSHOT_DIR}/screenshot_{timestamp}_{self.screenshot_count:03d}.png"
+        filename = self._screenshot_dir / f"screenshot_{timestamp}_{self.screenshot_count:03d}.jpg"
 
-        image.save(filename)
-        logger.debug(f"Screenshot saved: {filename}")
+        try:
+            self._save_q.put_nowait((image, filename))
+        except queue.Full:
+            # Writer is behind - drop the oldest pending screenshot
+            try:
+                self._save_q.get_nowait()
+            except queue.Empty:
+                pass
+            self._save_q.put_nowait((image, filename))
 
         return filename
 
+    def _writer_loop(self):
+        """Background thread: encode and write queued screenshots"""
+        while True:
+            image, filename = self._save_q.get()
+            try:
+                image.save(filename, format="JPEG", quality=config.SCREENSHOT_QUALITY)
+                logger.debug("Screenshot saved: %s", filename)
+            except Exception as e:
+                logger.error(f"Failed to save screenshot {filename}: {e}")
+
     def capture_region(self, x: int, y: int, width: int, height: int,
                       save: bool = False) -> Optional[Image.Image]:
         """
@@ -103,7 +183,7 @@ class ScreenCapture:
         if full_image:
             region = full_image.crop((x, y, x + width, y + height))
 
-            if save:
+            if save and config.SAVE_DEBUG_SCREENSHOTS:
                 self._save_screenshot(region)
 
             return region
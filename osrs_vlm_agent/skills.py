@@ -3,13 +3,31 @@ skills.py - Skill library for OSRS actions
 """
 
 import time
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Dict
+import numpy as np
 from PIL import Image
 
+import config
 from logger import logger
 from screen_capture import screen_capture
 from action_executor import action_executor
-from vision import vision_model
+from vision import get_vision_model, stop_at_int
+
+
+# Max size of inventory crops sent to the VLM
+INVENTORY_IMAGE_SIZE = (512, 512)
+
+# Local log detection: inventory grid and log-brown range in PIL HSV (0-255 per channel).
+# The saturation floor separates log bark (~120-170) from the panel's own
+# brown backdrop (~70-86)
+INVENTORY_ROWS = 7
+LOG_HSV_LOW = (14, 105, 50)
+LOG_HSV_HIGH = (35, 180, 160)
+LOG_SLOT_MIN_FRACTION = 0.08  # Fraction of a slot's pixels that must match
+
+COUNT_LOGS_PROMPT = """Look at this OSRS inventory.
+Count how many inventory slots contain logs (any type).
+Return ONLY a number. If no logs, return 0."""
 
 
 class SkillLibrary:
@@ -22,13 +40,28 @@ class SkillLibrary:
         self.slot_width = 42  # Approximate, will be refined
         self.slot_height = 36  # Approximate, will be refined
         self.slots_per_row = 4
+        # Precomputed slot centers, rebuilt on first use after calibration
+        self._slot_centers: Optional[List[Tuple[int, int]]] = None
+        # Log count reported by the last fire verification, consumed by
+        # the next count_logs_in_inventory() to save a VLM call
+        self._logs_remaining: Optional[int] = None
+        # Last known log count, used to sanity-check the pixel heuristic
+        self._last_log_count: Optional[int] = None
 
     def calibrate_inventory(self):
         """Use VLM to calibrate inventory position (TODO: implement)"""
         logger.info("Inventory calibration not yet implemented, using defaults")
         # For now, these will need to be set manually or detected visually
         # In resizable mode, inventory position varies
-        pass
+        self._slot_centers = None
+
+    def _rebuild_slots(self):
+        """Precompute center coordinates of all 28 inventory slots"""
+        self._slot_centers = [
+            (self.inventory_start_x + (slot % self.slots_per_row) * self.slot_width + self.slot_width // 2,
+             self.inventory_start_y + (slot // self.slots_per_row) * self.slot_height + self.slot_height // 2)
+            for slot in range(28)
+        ]
 
     def get_slot_center(self, slot: int) -> Tuple[int, int]:
         """
@@ -45,13 +78,17 @@ class SkillLibrary:
             # For now, raise error - this needs to be calibrated
             raise ValueError("Inventory not calibrated. Run calibrate_inventory() first")
 
-        row = slot // self.slots_per_row
-        col = slot % self.slots_per_row
+        if self._slot_centers is None:
+            self._rebuild_slots()
 
-        x = self.inventory_start_x + (col * self.slot_width) + (self.slot_width // 2)
-        y = self.inventory_start_y + (row * self.slot_height) + (self.slot_height // 2)
+        return self._slot_centers[slot]
 
-        return x, y
+    def _capture_inventory(self) -> Optional[Image.Image]:
+        """Capture just the inventory panel, downscaled for VLM queries"""
+        image = screen_capture.capture_region(*config.INVENTORY_ROI, save=False)
+        if image:
+            image.thumbnail(INVENTORY_IMAGE_SIZE, Image.LANCZOS)
+        return image
 
     def click_inventory_slot(self, slot: int, item_name: Optional[str] = None) -> bool:
         """
@@ -84,28 +121,30 @@ class SkillLibrary:
         """
         logger.log_action("FIND_ITEM", item_name)
 
-        # Capture inventory region (TODO: make this dynamic)
-        screenshot = screen_capture.capture(save=False)
+        # Capture inventory region
+        screenshot = self._capture_inventory()
 
         if not screenshot:
             return None
 
         # Use VLM to find item
         if item_name.lower() == "tinderbox":
-            slot = vision_model.find_tinderbox(screenshot)
+            slot = get_vision_model().find_tinderbox(screenshot)
         elif "log" in item_name.lower():
-            slot = vision_model.find_logs(screenshot)
+            slot = get_vision_model().find_logs(screenshot)
         else:
             # Generic item search
             prompt = f"""Look at this OSRS inventory. Find the {item_name}.
             Return ONLY the slot number (0-27) where it is located.
             If not found, return -1. Respond with just the number."""
 
-            response = vision_model.analyze_screenshot(screenshot, prompt)
+            response = get_vision_model().analyze_screenshot(screenshot, prompt, lossless=True,
+                                                             complexity="trivial", max_tokens=16,
+                                                             stop_fn=stop_at_int)
             try:
                 slot = int(response.strip()) if response else None
                 slot = slot if slot and slot >= 0 else None
-            except:
+            except ValueError:
                 slot = None
 
         if slot is not None:
@@ -115,6 +154,39 @@ class SkillLibrary:
 
         return slot
 
+    def find_items_visual(self, item_names: List[str]) -> Dict[str, Optional[int]]:
+        """
+        Find several items in inventory with a single screenshot and VLM call
+
+        Args:
+            item_names: Names of items to find
+
+        Returns:
+            Dict mapping each item name to its slot number (None if not found)
+        """
+        logger.log_action("FIND_ITEMS", ", ".join(item_names))
+
+        slots: Dict[str, Optional[int]] = {name: None for name in item_names}
+
+        screenshot = self._capture_inventory()
+        if not screenshot:
+            return slots
+
+        # One structured inventory call; lookups after the first hit the VLM cache
+        for name in item_names:
+            if "log" in name.lower():
+                slots[name] = get_vision_model().find_logs(screenshot)
+            else:
+                slots[name] = get_vision_model().find_item_slot(screenshot, name)
+
+        for name, slot in slots.items():
+            if slot is not None:
+                logger.log_success(f"Found {name} in slot {slot}")
+            else:
+                logger.log_error(f"{name} not found in inventory")
+
+        return slots
+
     def use_item_on_item(self, item1: str, item2: str) -> bool:
         """
         Use one item on another (e.g., tinderbox on logs)
@@ -128,9 +200,10 @@ class SkillLibrary:
         """
         logger.log_skill("use_item_on_item", f"{item1} -> {item2}")
 
-        # Find both items
-        slot1 = self.find_item_visual(item1)
-        slot2 = self.find_item_visual(item2)
+        # Find both items from one screenshot
+        slots = self.find_items_visual([item1, item2])
+        slot1 = slots[item1]
+        slot2 = slots[item2]
 
         if slot1 is None or slot2 is None:
             logger.log_error(f"Could not find items: {item1}, {item2}", retry=False)
@@ -162,10 +235,10 @@ class SkillLibrary:
         # Wait for fire to appear
         action_executor.wait(2.0)
 
-        # Verify fire was made
+        # Verify fire was made (also picks up the remaining log count)
         screenshot = screen_capture.capture(save=True)
         if screenshot:
-            fire_made = vision_model.verify_fire_made(screenshot)
+            fire_made, self._logs_remaining = get_vision_model().verify_fire_and_count_logs(screenshot)
             if fire_made:
                 logger.log_success("Fire created")
                 return True
@@ -201,21 +274,62 @@ class SkillLibrary:
         Returns:
             Number of log stacks
         """
-        screenshot = screen_capture.capture(save=False)
+        # Reuse the count from the last fire verification if there is one
+        if self._logs_remaining is not None:
+            count, self._logs_remaining = self._logs_remaining, None
+            logger.debug("Logs remaining: %d", count)
+        else:
+            count = self._count_logs()
+
+        self._last_log_count = count
+        return count
+
+    def _count_logs(self) -> int:
+        """Count logs with the pixel heuristic, falling back to the VLM if implausible"""
+        count = self._count_logs_local()
+
+        # One fire burns one log, so dropping to zero from several is suspect
+        if count is None or (count == 0 and (self._last_log_count or 0) > 1):
+            logger.debug("Local log count implausible (%s), asking VLM", count)
+            return self._count_logs_visual()
+
+        logger.debug("Logs remaining: %d", count)
+        return count
+
+    def _count_logs_local(self) -> Optional[int]:
+        """Count inventory slots containing logs by their brown pixel color"""
+        image = screen_capture.capture_region(*config.INVENTORY_ROI, save=False)
+        if not image:
+            return None
+
+        hsv = np.asarray(image.convert("HSV"))
+        cols, rows = self.slots_per_row, INVENTORY_ROWS
+        slot_w = hsv.shape[1] // cols
+        slot_h = hsv.shape[0] // rows
+
+        # Mask log-colored pixels over the whole grid, then sum per slot in
+        # one reduction over a (rows, cols, slot_h, slot_w) view
+        grid = hsv[:rows * slot_h, :cols * slot_w]
+        matches = np.all((grid >= LOG_HSV_LOW) & (grid <= LOG_HSV_HIGH), axis=-1)
+        per_slot = matches.reshape(rows, slot_h, cols, slot_w).sum(axis=(1, 3))
+
+        return int(np.count_nonzero(per_slot > LOG_SLOT_MIN_FRACTION * slot_w * slot_h))
+
+    def _count_logs_visual(self) -> int:
+        """Count logs in inventory with a VLM call"""
+        screenshot = self._capture_inventory()
         if not screenshot:
             return 0
 
-        prompt = """Look at this OSRS inventory.
-        Count how many inventory slots contain logs (any type).
-        Return ONLY a number. If no logs, return 0."""
-
-        response = vision_model.analyze_screenshot(screenshot, prompt)
+        response = get_vision_model().analyze_screenshot(screenshot, COUNT_LOGS_PROMPT, lossless=True,
+                                                         complexity="trivial", max_tokens=16,
+                                                         stop_fn=stop_at_int, cache_prompt=True)
 
         try:
             count = int(response.strip()) if response else 0
-            logger.debug(f"Logs remaining: {count}")
+            logger.debug("Logs remaining: %d", count)
             return count
-        except:
+        except ValueError:
             logger.warning("Failed to count logs")
             return 0
 
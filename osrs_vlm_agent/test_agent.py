@@ -6,14 +6,28 @@ No actions, just observation and analysis
 
 import sys
 import time
+from typing import Optional
+from PIL import Image
 
 from logger import logger
 from window_manager import window_manager
 from screen_capture import screen_capture
-from vision import vision_model
+from vision import get_vision_model
 import config
 
 
+VLM_BASIC_PROMPT = """Look at this Old School RuneScape screenshot.
+        Describe what you see in 1-2 sentences.
+        What is the player doing? What's visible on screen?"""
+
+INVENTORY_PROMPT = """Look at this OSRS inventory.
+        List all items you can see in the inventory.
+        If the inventory is empty, say "empty".
+        Keep it brief - just item names."""
+# Only the inventory panel is sent, pixel-exact
+INVENTORY_ARGS = {"region": config.INVENTORY_ROI, "lossless": True}
+
+
 class TestAgent:
     """Simple test agent for validation"""
 
@@ -33,18 +47,19 @@ class TestAgent:
 
         region = window_manager.get_region()
         logger.log_success(f"✅ Found RuneLite window")
-        logger.info(f"  Position: ({region['left']}, {region['top']})")
-        logger.info(f"  Size: {region['width']}x{region['height']}")
+        logger.info(f"  Position: ({region.left}, {region.top})")
+        logger.info(f"  Size: {region.width}x{region.height}")
 
         return True
 
-    def test_screenshot(self) -> bool:
+    def test_screenshot(self, screenshot: Optional[Image.Image] = None) -> bool:
         """Test 2: Screenshot capture"""
         logger.info("\n" + "=" * 60)
         logger.info("TEST 2: Screenshot Capture")
         logger.info("=" * 60)
 
-        screenshot = screen_capture.capture(save=True)
+        if screenshot is None:
+            screenshot = screen_capture.capture(save=True)
 
         if not screenshot:
             logger.error("❌ Screenshot capture failed")
@@ -56,30 +71,27 @@ class TestAgent:
 
         return True
 
-    def test_vlm_basic(self) -> bool:
+    def test_vlm_basic(self, screenshot: Optional[Image.Image] = None) -> bool:
         """Test 3: Basic VLM understanding"""
         logger.info("\n" + "=" * 60)
         logger.info("TEST 3: VLM Basic Understanding")
         logger.info("=" * 60)
 
-        if not vision_model.client:
+        if not get_vision_model().client:
             logger.warning("⚠️  VLM not configured (no API key)")
             logger.info("Set ANTHROPIC_API_KEY or OPENAI_API_KEY to test VLM")
             return False
 
-        screenshot = screen_capture.capture(save=False)
+        if screenshot is None:
+            screenshot = screen_capture.capture(save=False)
         if not screenshot:
             logger.error("❌ Could not capture screenshot for VLM test")
             return False
 
-        prompt = """Look at this Old School RuneScape screenshot.
-        Describe what you see in 1-2 sentences.
-        What is the player doing? What's visible on screen?"""
-
         logger.info("Asking VLM: 'What do you see in this OSRS screenshot?'")
         logger.info("(This may take a few seconds...)")
 
-        response = vision_model.analyze_screenshot(screenshot, prompt)
+        response = get_vision_model().analyze_screenshot(screenshot, VLM_BASIC_PROMPT)
 
         if response:
             logger.log_success("✅ VLM response received")
@@ -89,29 +101,25 @@ class TestAgent:
             logger.error("❌ VLM analysis failed")
             return False
 
-    def test_inventory_analysis(self) -> bool:
+    def test_inventory_analysis(self, screenshot: Optional[Image.Image] = None) -> bool:
         """Test 4: Inventory item detection"""
         logger.info("\n" + "=" * 60)
         logger.info("TEST 4: Inventory Analysis")
         logger.info("=" * 60)
 
-        if not vision_model.client:
+        if not get_vision_model().client:
             logger.warning("⚠️  VLM not configured - skipping inventory test")
             return False
 
-        screenshot = screen_capture.capture(save=False)
+        if screenshot is None:
+            screenshot = screen_capture.capture(save=False)
         if not screenshot:
             logger.error("❌ Could not capture screenshot")
             return False
 
-        prompt = """Look at this OSRS screenshot and focus on the inventory (right side).
-        List all items you can see in the inventory.
-        If the inventory is empty, say "empty".
-        Keep it brief - just item names."""
-
         logger.info("Asking VLM to analyze inventory...")
 
-        response = vision_model.analyze_screenshot(screenshot, prompt)
+        response = get_vision_model().analyze_screenshot(screenshot, INVENTORY_PROMPT, **INVENTORY_ARGS)
 
         if response:
             logger.log_success("✅ Inventory analysis complete")
@@ -130,7 +138,7 @@ class TestAgent:
         logger.info("Type 'refresh' to take a new screenshot")
         logger.info("Type 'quit' to exit\n")
 
-        if not vision_model.client:
+        if not get_vision_model().client:
             logger.warning("⚠️  VLM not configured - cannot run interactive mode")
             return
 
@@ -155,7 +163,7 @@ class TestAgent:
 
                 # Ask VLM
                 logger.info("Asking VLM...")
-                response = vision_model.analyze_screenshot(screenshot, question)
+                response = get_vision_model().analyze_screenshot(screenshot, question, reuse_similar=True)
 
                 if response:
                     logger.log_vision(response)
@@ -168,29 +176,48 @@ class TestAgent:
             except Exception as e:
                 logger.error(f"Error: {e}")
 
+    def _run_test(self, test_name: str, test_func, results: dict):
+        """Run one test, recording a crash as a failure"""
+        try:
+            results[test_name] = test_func()
+            time.sleep(0.5)
+        except Exception as e:
+            logger.error(f"❌ {test_name} crashed: {e}")
+            results[test_name] = False
+
     def run_all_tests(self):
         """Run all tests in sequence"""
         logger.info("\n" + "=" * 60)
         logger.info("OSRS VLM Agent - Test Suite")
         logger.info("=" * 60 + "\n")
 
-        tests = [
-            ("Window Detection", self.test_window_detection),
-            ("Screenshot Capture", self.test_screenshot),
-            ("VLM Basic Understanding", self.test_vlm_basic),
-            ("Inventory Analysis", self.test_inventory_analysis),
+        results = {}
+        self._run_test("Window Detection", self.test_window_detection, results)
+
+        # One capture, taken once the window is found, is shared by the
+        # screenshot and VLM tests
+        shot = screen_capture.capture(save=True) if results["Window Detection"] else None
+        self._run_test("Screenshot Capture", lambda: self.test_screenshot(shot), results)
+
+        vlm_tests = [
+            ("VLM Basic Understanding", lambda: self.test_vlm_basic(shot)),
+            ("Inventory Analysis", lambda: self.test_inventory_analysis(shot)),
         ]
 
-        results = {}
+        if shot is None:
+            logger.warning("No screenshot available - skipping VLM tests")
+            for test_name, _ in vlm_tests:
+                results[test_name] = None
+        else:
+            # Send both VLM prompts concurrently - the VLM tests below
+            # then get their answers from the response cache
+            if get_vision_model().client:
+                logger.info("Sending VLM test prompts in parallel...")
+                get_vision_model().analyze_many(shot, [VLM_BASIC_PROMPT,
+                                                       (INVENTORY_PROMPT, INVENTORY_ARGS)])
 
-        for test_name, test_func in tests:
-            try:
-                result = test_func()
-                results[test_name] = result
-                time.sleep(0.5)
-            except Exception as e:
-                logger.error(f"❌ {test_name} crashed: {e}")
-                results[test_name] = False
+            for test_name, test_func in vlm_tests:
+                self._run_test(test_name, test_func, results)
 
         # Summary
         logger.info("\n" + "=" * 60)
@@ -201,7 +228,7 @@ class TestAgent:
         total = len(results)
 
         for test_name, result in results.items():
-            status = "✅ PASS" if result else "❌ FAIL"
+            status = "⏭️  SKIP" if result is None else "✅ PASS" if result else "❌ FAIL"
             logger.info(f"  {status} - {test_name}")
 
         logger.info(f"\nResults: {passed}/{total} tests passed")
@@ -3,12 +3,103 @@ vision.py - VLM integration for visual understanding
 """
 
 import base64
+import hashlib
 import io
-from typing import Optional, Dict, List
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple, Literal, Callable, Union
 from PIL import Image
 
 import config
 from logger import logger
+from screen_capture import encode_jpeg
+
+# Optional: pybase64 has a SIMD (AVX2/NEON) encoder and returns str directly
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data: bytes) -> str:
+        return base64.b64encode(data).decode('ascii')
+
+
+# Longest image edge sent to the VLM (larger images are downscaled)
+MAX_IMAGE_EDGE = 1024
+
+# Frames whose difference hashes differ in at most this many bits count as unchanged
+SIMILAR_FRAME_DISTANCE = 4
+
+# Static prompts, sent with cache_prompt=True so OpenAI can route them to the
+# same prompt cache. Bump PROMPT_VERSION when editing one to start fresh keys.
+PROMPT_VERSION = 1
+
+INVENTORY_PROMPT = """Analyze this OSRS inventory screenshot.
+Identify all items and their positions in the inventory grid.
+Inventory slots are numbered 0-27, left to right, top to bottom.
+Return ONLY JSON with format: {"items": [{"slot": slot_number, "name": "item_name"}]}"""
+
+FIRE_PROMPT = """Look at this OSRS game screenshot.
+Is there a fire visible on the ground?
+Respond with ONLY 'yes' or 'no'."""
+
+FIRE_AND_LOGS_PROMPT = """Look at this OSRS game screenshot.
+1. Is there a fire visible on the ground?
+2. How many inventory slots contain logs (any type)?
+Return ONLY JSON with format: {"fire_made": true/false, "logs_remaining": number}"""
+
+
+def stop_at_int(text: str) -> bool:
+    """Streaming stop check: a complete integer has been received"""
+    return re.match(r'\s*-?\d+\D', text) is not None
+
+
+def stop_at_yes_no(text: str) -> bool:
+    """Streaming stop check: the reply has started with yes or no"""
+    return text.strip().lower().startswith(('yes', 'no'))
+
+
+def _frame_hash(image: Image.Image) -> int:
+    """64-bit difference hash of an image (robust to noise and compression)"""
+    pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def _prompt_cache_key(prompt: str) -> str:
+    """Stable provider cache key for a static prompt"""
+    return f"osrs-v{PROMPT_VERSION}-{hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest()}"
+
+
+def _extract_json(response: str) -> Dict:
+    """Parse the outermost JSON object in a VLM response (ignores surrounding text/fences)"""
+    start, end = response.find('{'), response.rfind('}') + 1
+    return json.loads(response[start:end])
+
+
+@lru_cache(maxsize=32)
+def _parse_inventory(response: str) -> Tuple[Tuple[int, str], ...]:
+    """(slot, name) pairs from an inventory JSON response, dropping out-of-range slots"""
+    items = []
+    for item in _extract_json(response).get("items", []):
+        slot = int(item["slot"])
+        if 0 <= slot <= 27:
+            items.append((slot, str(item["name"])))
+    return tuple(items)
+
+
+@lru_cache(maxsize=32)
+def _parse_fire_and_logs(response: str) -> Tuple[bool, int]:
+    """(fire_made, logs_remaining) from a fire/logs JSON response"""
+    result = _extract_json(response)
+    return bool(result.get("fire_made")), int(result["logs_remaining"])
 
 
 class VisionModel:
@@ -16,6 +107,15 @@ class VisionModel:
 
     def __init__(self):
         self.provider = config.VLM_PROVIDER
+        # LRU cache of responses keyed by (image digest, prompt, detail, model,
+        # max_tokens, json_mode, stop_fn)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Answers for the current scene, reused while frames stay similar
+        self._last_frame_hash: Optional[int] = None
+        self._last_qa: Dict[str, str] = {}
+        # Worker threads for concurrent VLM requests (caps in-flight requests)
+        self._request_pool = ThreadPoolExecutor(max_workers=config.VLM_MAX_CONCURRENCY)
         self._setup_client()
 
     def _setup_client(self):
@@ -23,7 +123,8 @@ class VisionModel:
         if self.provider == "anthropic":
             try:
                 import anthropic
-                self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+                self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY,
+                                                  http_client=self._make_http_client())
                 logger.info(f"Initialized Anthropic Claude ({config.CLAUDE_MODEL})")
             except ImportError:
                 logger.error("anthropic package not installed. Run: pip install anthropic")
@@ -35,7 +136,8 @@ class VisionModel:
         elif self.provider == "openai":
             try:
                 import openai
-                self.client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+                self.client = openai.OpenAI(api_key=config.OPENAI_API_KEY,
+                                            http_client=self._make_http_client())
                 logger.info(f"Initialized OpenAI ({config.OPENAI_MODEL})")
             except ImportError:
                 logger.error("openai package not installed. Run: pip install openai")
@@ -52,19 +154,118 @@ class VisionModel:
             logger.error(f"Unknown VLM provider: {self.provider}")
             self.client = None
 
-    def _encode_image(self, image: Image.Image) -> str:
-        """Encode PIL Image to base64"""
-        buffered = io.BytesIO()
-        image.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+        if self.client:
+            threading.Thread(target=self._warm_up_connection, daemon=True).start()
+
+    def _make_http_client(self):
+        """HTTP client with a persistent keep-alive pool (HTTP/2 if h2 is installed)"""
+        import httpx
+
+        limits = httpx.Limits(max_keepalive_connections=8, max_connections=16,
+                              keepalive_expiry=60.0)
+        timeout = httpx.Timeout(60.0, connect=5.0)
+        try:
+            return httpx.Client(http2=True, limits=limits, timeout=timeout)
+        except ImportError:
+            logger.debug("h2 not installed, using HTTP/1.1 for VLM requests")
+            return httpx.Client(limits=limits, timeout=timeout)
+
+    def _warm_up_connection(self):
+        """Open the TCP/TLS connection before the first VLM request needs it"""
+        try:
+            self.client.models.list()
+            logger.debug("VLM connection warmed up")
+        except Exception as e:
+            logger.debug(f"VLM connection warm-up failed: {e}")
 
-    def analyze_screenshot(self, image: Image.Image, prompt: str) -> Optional[str]:
+    def _preprocess(self, image: Image.Image, region: Optional[Tuple[int, int, int, int]] = None,
+                    max_edge: int = MAX_IMAGE_EDGE,
+                    resample: int = Image.BILINEAR) -> Image.Image:
+        """
+        Crop image to region (x, y, width, height) and downscale to max_edge
+
+        Downscaling box-reduces first (reducing_gap), then does one resample
+        pass - BILINEAR by default, which the VLM can't tell apart from
+        LANCZOS at this size.
+        """
+        if region:
+            x, y, width, height = region
+            image = image.crop((x, y, x + width, y + height))
+
+        scale = max_edge / max(image.size)
+        if scale < 1:
+            new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(new_size, resample, reducing_gap=2.0)
+
+        return image
+
+    def _encode_image(self, image: Image.Image, lossless: bool = False) -> Tuple[bytes, str, str]:
+        """
+        Encode PIL Image for the VLM
+
+        Returns:
+            (encoded bytes, base64 data, media type) - PNG if lossless,
+            otherwise config.VLM_IMAGE_FORMAT (WebP or JPEG)
+        """
+        if lossless:
+            buffered = io.BytesIO()
+            # Fast deflate: higher levels cost a lot of CPU for little size gain
+            image.save(buffered, format="PNG", optimize=False, compress_level=1)
+            image_bytes, media_type = buffered.getvalue(), "image/png"
+        elif config.VLM_IMAGE_FORMAT == "webp":
+            buffered = io.BytesIO()
+            image.save(buffered, format="WEBP", quality=85, method=4)
+            image_bytes, media_type = buffered.getvalue(), "image/webp"
+        else:
+            image_bytes, media_type = encode_jpeg(image, quality=85), "image/jpeg"
+
+        return image_bytes, b64encode_as_string(image_bytes), media_type
+
+    def _cache_get(self, key: tuple) -> Optional[str]:
+        """Look up a cached response, marking it most recently used"""
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+            return response
+
+    def _cache_put(self, key: tuple, response: str):
+        """Store a response, evicting the least recently used beyond VLM_CACHE_SIZE"""
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > config.VLM_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def analyze_screenshot(self, image: Image.Image, prompt: str,
+                           region: Optional[Tuple[int, int, int, int]] = None,
+                           lossless: bool = False, detail: str = "auto",
+                           json_mode: bool = False,
+                           complexity: Literal["trivial", "normal"] = "normal",
+                           max_tokens: int = 1024,
+                           stop_fn: Optional[Callable[[str], bool]] = None,
+                           reuse_similar: bool = False,
+                           cache_prompt: bool = False) -> Optional[str]:
         """
         Analyze a screenshot with VLM
 
         Args:
             image: PIL Image to analyze
             prompt: Question/instruction for the VLM
+            region: Only send this (x, y, width, height) part of the image
+            lossless: Send as PNG instead of WebP/JPEG, downscaled with LANCZOS
+                (for pixel-exact inventory prompts)
+            detail: OpenAI image detail level ('low' for coarse yes/no questions)
+            json_mode: Force the response to be a JSON object
+            complexity: 'trivial' routes to the smaller, faster apprentice model
+                (for yes/no or single-number answers)
+            max_tokens: Response length limit
+            stop_fn: Stream the response and stop as soon as stop_fn(text so far)
+                is True (e.g. stop_at_int, stop_at_yes_no)
+            reuse_similar: Return the previous answer to this prompt if the frame
+                is visually unchanged (for interactive Q&A, not agent decisions)
+            cache_prompt: prompt is a static template - OpenAI routes calls with
+                it to the same prompt cache (prompt_cache_key)
 
         Returns:
             VLM response text or None if failed
@@ -74,56 +275,158 @@ class VisionModel:
             return None
 
         try:
+            # Pixel-exact (inventory) images keep the sharper LANCZOS filter
+            image = self._preprocess(image, region,
+                                     resample=Image.LANCZOS if lossless else Image.BILINEAR)
+
+            if reuse_similar:
+                answer = self._similar_frame_answer(image, prompt)
+                if answer is not None:
+                    logger.debug("Frame unchanged, reusing previous answer")
+                    return answer
+
+            image_bytes, image_data, media_type = self._encode_image(image, lossless)
+            model = self._select_model(complexity)
+
+            # Identical image + prompt was already answered; the reply-shaping
+            # arguments are part of the key so truncated or prefilled replies
+            # are only reused by calls asking for the same
+            key = (hashlib.blake2b(image_bytes, digest_size=16).digest(), prompt, detail, model,
+                   max_tokens, json_mode, stop_fn)
+            response = self._cache_get(key)
+            if response is not None:
+                logger.debug("VLM cache hit")
+                return response
+
             if self.provider == "anthropic":
-                return self._analyze_anthropic(image, prompt)
+                response = self._analyze_anthropic(image_data, media_type, prompt,
+                                                   model, max_tokens, json_mode, stop_fn)
             elif self.provider == "openai":
-                return self._analyze_openai(image, prompt)
+                response = self._analyze_openai(image_data, media_type, prompt,
+                                                model, max_tokens, detail, json_mode, stop_fn,
+                                                cache_prompt)
             else:
                 logger.error(f"Provider {self.provider} not supported")
                 return None
 
+            if response is not None:
+                self._cache_put(key, response)
+                if reuse_similar:
+                    self._last_qa[prompt] = response
+            return response
+
         except Exception as e:
             logger.error(f"VLM analysis failed: {e}")
             return None
 
-    def _analyze_anthropic(self, image: Image.Image, prompt: str) -> Optional[str]:
-        """Analyze with Claude Vision"""
-        image_data = self._encode_image(image)
+    def _similar_frame_answer(self, image: Image.Image, prompt: str) -> Optional[str]:
+        """Previous answer to prompt if image matches the current scene, else None"""
+        frame_hash = _frame_hash(image)
 
-        message = self.client.messages.create(
-            model=config.CLAUDE_MODEL,
-            max_tokens=1024,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": image_data,
-                            },
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ],
-                }
-            ],
-        )
+        # A significantly different frame starts a new scene
+        if (self._last_frame_hash is None or
+                bin(frame_hash ^ self._last_frame_hash).count('1') > SIMILAR_FRAME_DISTANCE):
+            self._last_frame_hash = frame_hash
+            self._last_qa = {}
+            return None
 
-        response = message.content[0].text
+        return self._last_qa.get(prompt)
+
+    def _select_model(self, complexity: str) -> str:
+        """Pick the main or apprentice model for the provider"""
+        if self.provider == "openai":
+            return config.OPENAI_APPRENTICE_MODEL if complexity == "trivial" else config.OPENAI_MODEL
+        return config.CLAUDE_APPRENTICE_MODEL if complexity == "trivial" else config.CLAUDE_MODEL
+
+    def analyze_many(self, image: Image.Image, prompts: List[Union[str, Tuple[str, Dict]]],
+                     **kwargs) -> List[Optional[str]]:
+        """
+        Analyze one image with several independent prompts concurrently
+
+        Args:
+            image: PIL Image to analyze
+            prompts: Prompts to run, each either a prompt string or a
+                (prompt, kwargs) pair whose kwargs override the shared ones
+            **kwargs: Passed to analyze_screenshot for every prompt
+
+        Returns:
+            Responses in the same order as prompts
+        """
+        futures = []
+        for prompt in prompts:
+            prompt, prompt_kwargs = (prompt, {}) if isinstance(prompt, str) else prompt
+            futures.append(self._request_pool.submit(self.analyze_screenshot, image, prompt,
+                                                     **{**kwargs, **prompt_kwargs}))
+        return [future.result() for future in futures]
+
+    def _analyze_anthropic(self, image_data: str, media_type: str, prompt: str,
+                           model: str, max_tokens: int, json_mode: bool = False,
+                           stop_fn: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Analyze with Claude Vision"""
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": image_data,
+                        },
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt
+                    }
+                ],
+            }
+        ]
+
+        # Prefill the reply with "{" so Claude continues a JSON object
+        if json_mode:
+            messages.append({"role": "assistant", "content": "{"})
+
+        if stop_fn is None:
+            message = self.client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                messages=messages,
+            )
+            response = message.content[0].text
+        else:
+            # Stream and close the connection once the answer is complete
+            response = ""
+            with self.client.messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                messages=messages,
+            ) as stream:
+                for text in stream.text_stream:
+                    response += text
+                    if stop_fn(response):
+                        break
+
+        if json_mode:
+            response = "{" + response
         logger.log_vision(response[:100] + "..." if len(response) > 100 else response)
         return response
 
-    def _analyze_openai(self, image: Image.Image, prompt: str) -> Optional[str]:
+    def _analyze_openai(self, image_data: str, media_type: str, prompt: str,
+                        model: str, max_tokens: int, detail: str,
+                        json_mode: bool = False,
+                        stop_fn: Optional[Callable[[str], bool]] = None,
+                        cache_prompt: bool = False) -> Optional[str]:
         """Analyze with GPT-4V"""
-        image_data = self._encode_image(image)
+        extra_args = {"response_format": {"type": "json_object"}} if json_mode else {}
+        if stop_fn is not None:
+            extra_args["stream"] = True
+        if cache_prompt:
+            # Route calls sharing the prompt prefix to the same prompt cache
+            extra_args["extra_body"] = {"prompt_cache_key": _prompt_cache_key(prompt)}
 
         response = self.client.chat.completions.create(
-            model=config.OPENAI_MODEL,
+            model=model,
             messages=[
                 {
                     "role": "user",
@@ -135,94 +438,129 @@ class VisionModel:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_data}"
+                                "url": f"data:{media_type};base64,{image_data}",
+                                "detail": detail,
                             }
                         }
                     ],
                 }
             ],
-            max_tokens=1024,
+            max_tokens=max_tokens,
+            **extra_args,
         )
 
-        result = response.choices[0].message.content
+        if stop_fn is None:
+            result = response.choices[0].message.content
+        else:
+            # Stream and close the connection once the answer is complete
+            result = ""
+            try:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        result += chunk.choices[0].delta.content
+                        if stop_fn(result):
+                            break
+            finally:
+                response.close()
+
         logger.log_vision(result[:100] + "..." if len(result) > 100 else result)
         return result
 
-    def identify_items(self, image: Image.Image) -> Dict:
+    def analyze_inventory(self, image: Image.Image,
+                          region: Optional[Tuple[int, int, int, int]] = None) -> Dict:
         """
-        Identify items in inventory from screenshot
+        Identify all inventory items with a single structured VLM call
+
+        Results are cached by image, so the find_* helpers below can all be
+        called on the same image for the price of one request.
+
+        Args:
+            image: Inventory image (or full window with region=config.INVENTORY_ROI)
+            region: Part of the image containing the inventory
 
         Returns:
-            Dict with item names and positions
+            Dict with format {"items": [{"slot": int, "name": str}]}
         """
-        prompt = """Analyze this OSRS inventory screenshot.
-        Identify all items and their positions in the inventory grid.
-        Return as JSON with format: {"items": [{"name": "item_name", "slot": slot_number}]}
-        Inventory slots are numbered 0-27, left to right, top to bottom."""
-
-        response = self.analyze_screenshot(image, prompt)
+        response = self.analyze_screenshot(image, INVENTORY_PROMPT, region=region, lossless=True,
+                                           json_mode=True, cache_prompt=True)
 
+        items = []
         if response:
             try:
-                import json
-                return json.loads(response)
-            except:
-                logger.warning("Failed to parse VLM response as JSON")
-                return {"items": []}
+                items = [{"slot": slot, "name": name} for slot, name in _parse_inventory(response)]
+            except (json.JSONDecodeError, ValueError, TypeError, KeyError):
+                logger.warning("Failed to parse inventory JSON")
+
+        return {"items": items}
+
+    def find_item_slot(self, image: Image.Image, name: str,
+                       region: Optional[Tuple[int, int, int, int]] = None) -> Optional[int]:
+        """Return the first inventory slot whose item name contains name (case-insensitive)"""
+        name = name.lower()
+        slots = [item["slot"] for item in self.analyze_inventory(image, region)["items"]
+                 if name in item["name"].lower()]
+        return min(slots) if slots else None
+
+    def identify_items(self, image: Image.Image,
+                       region: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        """
+        Identify items in inventory from screenshot
 
-        return {"items": []}
+        Returns:
+            Dict with item names and positions
+        """
+        return self.analyze_inventory(image, region)
 
-    def find_tinderbox(self, image: Image.Image) -> Optional[int]:
+    def find_tinderbox(self, image: Image.Image,
+                       region: Optional[Tuple[int, int, int, int]] = None) -> Optional[int]:
         """Find tinderbox in inventory, return slot number"""
-        prompt = """Look at this OSRS inventory. Find the tinderbox.
-        Return ONLY the slot number (0-27) where the tinderbox is located.
-        If no tinderbox is found, return -1.
-        Respond with just the number, nothing else."""
-
-        response = self.analyze_screenshot(image, prompt)
+        return self.find_item_slot(image, "tinderbox", region)
+
+    def find_logs(self, image: Image.Image,
+                  region: Optional[Tuple[int, int, int, int]] = None) -> Optional[int]:
+        """Find logs in inventory (any type), return slot number of first stack"""
+        return self.find_item_slot(image, "log", region)
+
+    def find_inventory_items(self, image: Image.Image,
+                             region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, Optional[int]]:
+        """Find tinderbox and logs, return {'tinderbox': slot, 'logs': slot}"""
+        return {"tinderbox": self.find_tinderbox(image, region),
+                "logs": self.find_logs(image, region)}
+
+    def verify_fire_made(self, image: Image.Image,
+                         region: Optional[Tuple[int, int, int, int]] = config.GAME_VIEW_ROI) -> bool:
+        """Check if a fire was successfully made (looks at the game view only by default)"""
+        response = self.analyze_screenshot(image, FIRE_PROMPT, region=region, detail="low",
+                                           complexity="trivial", max_tokens=16,
+                                           stop_fn=stop_at_yes_no, cache_prompt=True)
 
         if response:
-            try:
-                slot = int(response.strip())
-                return slot if slot >= 0 else None
-            except:
-                logger.warning("Failed to parse tinderbox slot")
-                return None
+            return 'yes' in response.lower()
 
-        return None
+        return False
 
-    def find_logs(self, image: Image.Image) -> Optional[int]:
-        """Find logs in inventory, return slot number of first stack"""
-        prompt = """Look at this OSRS inventory. Find logs (any type: normal, oak, willow, etc).
-        Return ONLY the slot number (0-27) of the FIRST logs you see.
-        If no logs are found, return -1.
-        Respond with just the number, nothing else."""
+    def verify_fire_and_count_logs(self, image: Image.Image) -> Tuple[bool, Optional[int]]:
+        """
+        Check if a fire was made and count remaining logs in one VLM call
 
-        response = self.analyze_screenshot(image, prompt)
+        Returns:
+            (fire_made, logs_remaining) - logs_remaining is None if unparseable
+        """
+        # The reply is a ~40 token JSON object
+        response = self.analyze_screenshot(image, FIRE_AND_LOGS_PROMPT, json_mode=True,
+                                           max_tokens=64, cache_prompt=True)
 
         if response:
             try:
-                slot = int(response.strip())
-                return slot if slot >= 0 else None
-            except:
-                logger.warning("Failed to parse logs slot")
-                return None
-
-        return None
+                return _parse_fire_and_logs(response)
+            except (json.JSONDecodeError, ValueError, TypeError, KeyError):
+                logger.warning("Failed to parse fire/logs response")
+                return 'true' in response.lower(), None
 
-    def verify_fire_made(self, image: Image.Image) -> bool:
-        """Check if a fire was successfully made"""
-        prompt = """Look at this OSRS game screenshot.
-        Is there a fire visible on the ground?
-        Respond with ONLY 'yes' or 'no'."""
-
-        response = self.analyze_screenshot(image, prompt)
-
-        if response:
-            return 'yes' in response.lower()
-
-        return False
+        return False, None
 
 
-# Global vision model instance
-vision_model = VisionModel()
+@lru_cache(maxsize=1)
+def get_vision_model() -> VisionModel:
+    """Shared VisionModel, created (and its SDK client set up) on first use"""
+    return VisionModel()
@@ -2,30 +2,99 @@
 window_manager.py - RuneLite window detection and management
 """
 
-import json
-from typing import Optional, Dict
+import mmap
+import os
+import struct
+from dataclasses import dataclass, replace
+from typing import NamedTuple, Optional
 from Xlib import X, display
 from Xlib.error import XError
+from Xlib.protocol import request
 
 import config
 from logger import logger
 
+# Saved window geometry: x, y, width, height as little-endian int32
+GEOM_STRUCT = struct.Struct("<iiii")
+
+
+@dataclass(slots=True, frozen=True)
+class WindowGeom:
+    """Game window position and size in absolute screen coordinates"""
+    x: int
+    y: int
+    width: int
+    height: int
+    title: str
+
+
+class Region(NamedTuple):
+    """Capture region of the game window"""
+    left: int
+    top: int
+    width: int
+    height: int
+
 
 class WindowManager:
     """Manages RuneLite window detection and tracking"""
 
     def __init__(self):
-        self.window_config: Optional[Dict] = None
-        self.display = display.Display()
-        self.load_or_detect()
-
-    def _get_window_geometry(self, window):
-        """Get window geometry (position and size)"""
-        try:
-            geo = window.get_geometry()
-
-            # Translate to root window coordinates
-            coords = window.translate_coords(self.display.screen().root, 0, 0)
+        self.window_config: Optional[WindowGeom] = None
+        # Bumped whenever window_config is re-detected so callers can
+        # cache derived values (origin, capture region) cheaply
+        self.generation = 0
+        # Watched RuneLite window (ConfigureNotify keeps window_config current)
+        self._window = None
+        self._region_cache: Optional[Region] = None
+        # X display and window config are set up on first use, so importing
+        # this module doesn't open a display connection or search windows
+        self.display = None
+        self._initialized = False
+        # mmap of the saved geometry file, rewritten in place by save_config
+        self._geom_map: Optional[mmap.mmap] = None
+
+    def _ensure_display(self):
+        """Open the X display connection if not already open"""
+        if self.display is None:
+            self.display = display.Display()
+        return self.display
+
+    def _lazy_init(self):
+        """Open the display and load/detect the window config on first use"""
+        if not self._initialized:
+            self._initialized = True
+            self._ensure_display()
+            self.load_or_detect()
+
+    def _get_window_geometries(self, windows) -> list:
+        """
+        Get geometry (position and size) of several windows
+
+        The GetGeometry/TranslateCoords requests for every window are queued
+        first and their replies read afterwards, so the batch costs a single
+        round-trip instead of two per window. Entries are None for windows
+        that couldn't be queried.
+        """
+        root = self.display.screen().root
+        cookies = [
+            (request.GetGeometry(display=w.display, defer=True, drawable=w),
+             # Translate to root window coordinates
+             request.TranslateCoords(display=w.display, defer=True, src_wid=root,
+                                     dst_wid=w, src_x=0, src_y=0))
+            for w in windows
+        ]
+
+        geometries = []
+        for geo_cookie, coords_cookie in cookies:
+            # reply() only waits for the reply; its fields land on the request itself
+            try:
+                geo_cookie.reply()
+                coords_cookie.reply()
+            except XError:
+                geometries.append(None)
+                continue
+            geo, coords = geo_cookie, coords_cookie
 
             # Handle negative coordinates (window decorations)
             # If coords are negative, use their absolute value as offset
@@ -33,65 +102,110 @@ class WindowManager:
             offset_x = abs(min(0, coords.x))  # Left border width
             offset_y = abs(min(0, coords.y))  # Top titlebar height
 
-            # Start from offset position to skip decorations
-            x = offset_x
-            y = offset_y
+            # Start from offset position to skip decorations, keeping
+            # original dimensions (captures game content area)
+            geometries.append({
+                'x': offset_x,
+                'y': offset_y,
+                'width': geo.width,
+                'height': geo.height
+            })
 
-            # Keep original dimensions (captures game content area)
-            width = geo.width
-            height = geo.height
+        return geometries
 
-            return {
-                'x': x,
-                'y': y,
-                'width': width,
-                'height': height
-            }
-        except Exception as e:
-            return None
+    def _get_window_geometry(self, window):
+        """Get window geometry (position and size)"""
+        return self._get_window_geometries([window])[0]
+
+    def _match_results(self, matches) -> list:
+        """Attach geometry to (window, title) matches, dropping zero-sized windows"""
+        results = []
+        geometries = self._get_window_geometries([window for window, _ in matches])
+        for (window, title), geo in zip(matches, geometries):
+            if geo and geo['width'] > 0 and geo['height'] > 0:
+                results.append({
+                    'window': window,
+                    'title': title,
+                    **geo
+                })
+        return results
 
-    def _get_window_name(self, window):
-        """Get window title/name"""
+    def _get_window_name(self, window) -> Optional[str]:
+        """Get window title/name (prefers UTF-8 _NET_WM_NAME over legacy WM_NAME)"""
         try:
+            prop = window.get_full_property(self.display.intern_atom('_NET_WM_NAME'),
+                                            self.display.intern_atom('UTF8_STRING'))
+            if prop and prop.value:
+                value = prop.value
+                return value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
             return window.get_wm_name()
-        except:
+        except XError:
             return None
 
-    def _search_windows(self, window, name_filter, results=None):
-        """Recursively search for windows matching name filter"""
-        if results is None:
-            results = []
+    def _search_windows(self, window, name_filter, matches=None):
+        """Recursively collect (window, title) pairs matching name filter"""
+        if matches is None:
+            matches = []
 
         try:
             window_name = self._get_window_name(window)
 
             if window_name and name_filter.lower() in window_name.lower():
-                geo = self._get_window_geometry(window)
-                if geo and geo['width'] > 0 and geo['height'] > 0:
-                    # Store this as a potential match
-                    results.append({
-                        'window': window,
-                        'title': window_name,
-                        **geo
-                    })
+                # Store this as a potential match
+                matches.append((window, window_name))
 
             # Search children
             children = window.query_tree().children
             for child in children:
-                self._search_windows(child, name_filter, results)
+                self._search_windows(child, name_filter, matches)
 
         except XError:
             pass
 
-        return results
+        return matches
+
+    def _search_client_list(self, name_filter) -> Optional[list]:
+        """
+        Search top-level windows listed in the EWMH _NET_CLIENT_LIST property
+
+        One property read replaces a full tree walk. Returns None if the
+        window manager doesn't publish _NET_CLIENT_LIST.
+        """
+        root = self.display.screen().root
+        prop = root.get_full_property(self.display.intern_atom('_NET_CLIENT_LIST'),
+                                      X.AnyPropertyType)
+        if prop is None:
+            return None
+
+        matches = []
+        for wid in prop.value:
+            window = self.display.create_resource_object('window', wid)
+            try:
+                window_name = self._get_window_name(window)
 
-    def find_runelite_window(self) -> Optional[Dict]:
+                # Only query geometry for matching windows
+                if window_name and name_filter.lower() in window_name.lower():
+                    matches.append((window, window_name))
+            except XError:
+                pass
+
+        return self._match_results(matches)
+
+    def find_runelite_window(self) -> Optional[WindowGeom]:
         """Find RuneLite window using Xlib (Linux)"""
         try:
+            self._ensure_display()
             root = self.display.screen().root
 
-            # Search for all RuneLite windows
-            results = self._search_windows(root, config.GAME_NAME)
+            # Search for all RuneLite windows, walking the whole window tree
+            # only if the window manager doesn't support EWMH
+            try:
+                results = self._search_client_list(config.GAME_NAME)
+            except XError:
+                results = None
+            if results is None:
+                logger.debug("_NET_CLIENT_LIST unavailable, searching window tree")
+                results = self._match_results(self._search_windows(root, config.GAME_NAME))
 
             if not results:
                 logger.warning(f"{config.GAME_NAME} window not found!")
@@ -99,24 +213,22 @@ class WindowManager:
                 return None
 
             # Debug: show all found windows
-            logger.debug(f"Found {len(results)} RuneLite window(s):")
+            logger.debug("Found %d RuneLite window(s):", len(results))
             for i, r in enumerate(results):
-                logger.debug(f"  {i+1}. '{r['title']}' at ({r['x']}, {r['y']}) size {r['width']}x{r['height']}")
+                logger.debug("  %d. '%s' at (%d, %d) size %dx%d",
+                             i + 1, r['title'], r['x'], r['y'], r['width'], r['height'])
 
             # Just pick the largest window (tiling WM coordinates are already correct)
             result = max(results, key=lambda r: r['width'] * r['height'])
 
-            window_info = {
-                'x': result['x'],
-                'y': result['y'],
-                'width': result['width'],
-                'height': result['height'],
-                'title': result['title']
-            }
+            window_info = WindowGeom(result['x'], result['y'],
+                                     result['width'], result['height'], result['title'])
 
             logger.info(f"Found window: '{result['title']}' at ({result['x']}, {result['y']}) size {result['width']}x{result['height']}")
             if len(results) > 1:
-                logger.debug(f"Found {len(results)} RuneLite windows, selected the largest")
+                logger.debug("Found %d RuneLite windows, selected the largest", len(results))
+
+            self._watch_window(result['window'])
 
             return window_info
 
@@ -124,14 +236,84 @@ class WindowManager:
             logger.error(f"Error finding window: {e}")
             return None
 
+    def _watch_window(self, window):
+        """Subscribe to move/resize events on window"""
+        try:
+            window.change_attributes(event_mask=X.StructureNotifyMask)
+            self.display.flush()
+            self._window = window
+        except XError:
+            self._window = None
+
+    def _watch_loaded_window(self):
+        """Find the window for a loaded config so its moves are tracked"""
+        try:
+            results = self._search_client_list(config.GAME_NAME)
+        except XError:
+            results = None
+        if results:
+            result = max(results, key=lambda r: r['width'] * r['height'])
+            self._watch_window(result['window'])
+            # The window may have moved since the config was saved
+            self._apply_geometry({k: result[k] for k in ('x', 'y', 'width', 'height')})
+
+    def _apply_geometry(self, geo: dict):
+        """Update window_config to geo if it changed, invalidating cached regions"""
+        if any(getattr(self.window_config, k) != v for k, v in geo.items()):
+            self.window_config = replace(self.window_config, **geo)
+            self._region_cache = None
+            self.generation += 1
+            logger.debug("Window moved to (%d, %d) size %dx%d",
+                         geo['x'], geo['y'], geo['width'], geo['height'])
+            self.save_config()
+
+    def poll_events(self):
+        """Apply pending move/resize events of the watched window (non-blocking)"""
+        if self._window is None or not self.window_config:
+            return
+
+        moved = False
+        while self.display.pending_events():
+            event = self.display.next_event()
+            if event.type == X.ConfigureNotify:
+                moved = True
+            elif event.type == X.DestroyNotify:
+                logger.warning(f"{config.GAME_NAME} window closed")
+                self._window = None
+                return
+
+        if moved:
+            # Event coordinates can be parent-relative, so re-read geometry
+            geo = self._get_window_geometry(self._window)
+            if geo:
+                self._apply_geometry(geo)
+
+    def _open_geom_map(self, create: bool = False) -> mmap.mmap:
+        """Map the fixed-size geometry file, creating it if requested"""
+        if self._geom_map is None:
+            flags = os.O_RDWR | (os.O_CREAT if create else 0)
+            fd = os.open(config.WINDOW_CONFIG_FILE, flags, 0o644)
+            try:
+                if os.fstat(fd).st_size < GEOM_STRUCT.size:
+                    if not create:
+                        raise ValueError("truncated window config file")
+                    os.ftruncate(fd, GEOM_STRUCT.size)
+                self._geom_map = mmap.mmap(fd, GEOM_STRUCT.size)
+            finally:
+                os.close(fd)
+        return self._geom_map
+
     def load_or_detect(self) -> bool:
         """Load saved window config or detect new one"""
         # Try to load existing config
         try:
-            with open(config.WINDOW_CONFIG_FILE, 'r') as f:
-                self.window_config = json.load(f)
-                logger.info(f"Loaded window config from {config.WINDOW_CONFIG_FILE}")
-                return True
+            x, y, width, height = GEOM_STRUCT.unpack_from(self._open_geom_map())
+            if width <= 0 or height <= 0:
+                raise ValueError("empty window geometry")
+            self.window_config = WindowGeom(x, y, width, height, config.GAME_NAME)
+            logger.info(f"Loaded window config from {config.WINDOW_CONFIG_FILE}")
+            self._watch_loaded_window()
+            return True
         except FileNotFoundError:
             logger.debug("No saved window config found, detecting...")
         except Exception as e:
@@ -147,16 +329,20 @@ class WindowManager:
         return False
 
     def save_config(self):
-        """Save window configuration to file"""
+        """Save window geometry, overwriting the mapped file in place"""
         if self.window_config:
-            with open(config.WINDOW_CONFIG_FILE, 'w') as f:
-                json.dump(self.window_config, f, indent=2)
-            logger.debug(f"Saved window config to {config.WINDOW_CONFIG_FILE}")
+            geom = self.window_config
+            GEOM_STRUCT.pack_into(self._open_geom_map(create=True), 0,
+                                  geom.x, geom.y, geom.width, geom.height)
+            logger.debug("Saved window config to %s", config.WINDOW_CONFIG_FILE)
 
     def refresh(self) -> bool:
         """Re-detect window (useful if window moved/resized)"""
         logger.info("Refreshing window detection...")
+        self._initialized = True
         self.window_config = self.find_runelite_window()
+        self._region_cache = None
+        self.generation += 1
 
         if self.window_config:
             self.save_config()
@@ -164,31 +350,41 @@ class WindowManager:
 
         return False
 
-    def get_region(self) -> Optional[Dict]:
+    def get_region(self) -> Optional[Region]:
         """Get window region for screenshot capture"""
+        self._lazy_init()
+        self.poll_events()
+
         if not self.window_config:
             logger.error("No window config available")
             return None
 
-        return {
-            'left': self.window_config['x'],
-            'top': self.window_config['y'],
-            'width': self.window_config['width'],
-            'height': self.window_config['height']
-        }
+        if self._region_cache is None:
+            geom = self.window_config
+            self._region_cache = Region(geom.x, geom.y, geom.width, geom.height)
+
+        return self._region_cache
+
+    @property
+    def origin(self) -> tuple[int, int]:
+        """Top-left corner of the game window in absolute screen coordinates"""
+        self._lazy_init()
+        if not self.window_config:
+            raise ValueError("No window config available")
+
+        return self.window_config.x, self.window_config.y
 
     def get_absolute_coords(self, relative_x: int, relative_y: int) -> tuple[int, int]:
         """Convert relative window coordinates to absolute screen coordinates"""
+        self._lazy_init()
         if not self.window_config:
             raise ValueError("No window config available")
 
-        abs_x = self.window_config['x'] + relative_x
-        abs_y = self.window_config['y'] + relative_y
-
-        return abs_x, abs_y
+        return self.window_config.x + relative_x, self.window_config.y + relative_y
 
     def is_ready(self) -> bool:
         """Check if window manager is ready"""
+        self._lazy_init()
         return self.window_config is not None
 
 